@@ -0,0 +1,240 @@
+# api.py
+# Lightweight HTTP API over the same core as batch.py (standard library only).
+#
+# Usage:
+#   python api.py --host 127.0.0.1 --port 8600
+#
+# Endpoints:
+#   GET  /health            -> {"status": "ok"}
+#   POST /process           -> JSONL stream, one record per uploaded file
+#        {"files": [{"name": "a.pdf", "content_base64": "..."}],
+#         "mode": "summarize", "language": "en", "workers": 4}
+#   POST /jobs              -> {"job_id": "..."}; runs a directory batch in the background
+#        {"input_dir": "...", "output": "out.jsonl", "checkpoint": "...",
+#         "mode": "summarize", "language": "en", "workers": 8}
+#        Paths are relative to --data-root; anything resolving outside it is rejected.
+#        Output defaults to <data-root>/jobs/<job_id>.jsonl.
+#   GET  /jobs/<job_id>     -> job status and progress counters
+#   GET  /embeddings/stats  -> embedding throughput and cache hit ratio
+#
+# If secrets.toml has [api] token = "...", requests must send
+# "Authorization: Bearer <token>".
+import argparse
+import base64
+import hmac
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import core
+import embeddings
+from batch import MODES, DocumentSource, init_clients, process_document, run_batch, sources_from_paths
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 100 * 1024 * 1024  # 100 MB per request
+
+
+class APIState:
+    """Process-wide clients, rate limiter and background jobs for the server."""
+
+    def __init__(self, clients, rate_limiter, root, token=None, max_workers=16,
+                 embedding_dir=embeddings.DEFAULT_STORE_DIR):
+        self.clients = clients
+        self.root = os.path.realpath(root)  # Jobs may only read and write below this directory
+        self.rate_limiter = rate_limiter
+        self.token = token
+        self.max_workers = max_workers
+        self.embedding_dir = embedding_dir
+        self.jobs = {}
+        self.jobs_lock = threading.Lock()
+
+
+def _process_kwargs(state, body):
+    mode = body.get("mode", "summarize")
+    if mode not in MODES:
+        raise ValueError(f"Unsupported mode: {mode}")
+    kwargs = {
+        "mode": mode,
+        "language": body.get("language", "en"),
+        "model": body.get("model", core.DEFAULT_MODEL),
+        "vision_client": state.clients["vision_client"],
+        "rate_limiter": state.rate_limiter,
+    }
+    if mode == "embed":
+        # Created on first use; raises StoreLockedError if another process holds the store
+        kwargs["embedding_service"] = embeddings.get_embedding_service(store_dir=state.embedding_dir)
+    return kwargs
+
+
+def _workers(state, body):
+    return max(1, min(int(body.get("workers", 4)), state.max_workers))
+
+
+def _resolve_under_root(root, path):
+    """Resolves a client-supplied path against root, rejecting anything outside it."""
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"Path outside the data root: {path}")
+    return resolved
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    state = None  # Set by make_server
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self):
+        if not self.state.token:
+            return True
+        header = self.headers.get("Authorization", "")
+        return hmac.compare_digest(header, f"Bearer {self.state.token}")
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large.")
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object.")
+        return body
+
+    def do_GET(self):
+        if not self._authorized():
+            return self._send_json(401, {"error": "Unauthorized"})
+        if self.path == "/health":
+            return self._send_json(200, {"status": "ok"})
+        if self.path == "/embeddings/stats":
+            return self._send_json(200, embeddings.get_stats())
+        if self.path.startswith("/jobs/"):
+            job_id = self.path[len("/jobs/"):]
+            with self.state.jobs_lock:
+                job = self.state.jobs.get(job_id)
+                job = dict(job) if job else None
+            if job is None:
+                return self._send_json(404, {"error": "Unknown job"})
+            return self._send_json(200, job)
+        self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return self._send_json(401, {"error": "Unauthorized"})
+        try:
+            body = self._read_json()
+            if self.path == "/process":
+                return self._handle_process(body)
+            if self.path == "/jobs":
+                return self._handle_job(body)
+        except (ValueError, KeyError, TypeError) as e:
+            return self._send_json(400, {"error": str(e)})
+        except embeddings.StoreLockedError as e:
+            return self._send_json(503, {"error": str(e)})
+        self._send_json(404, {"error": "Not found"})
+
+    def _handle_process(self, body):
+        """Processes uploaded files and streams records back as JSONL."""
+        # Validate everything before the 200 is sent; afterwards errors can only
+        # be reported as JSONL records in the body.
+        kwargs = _process_kwargs(self.state, body)
+        workers = _workers(self.state, body)
+        sources = []
+        for i, f in enumerate(body["files"]):
+            content = base64.b64decode(f["content_base64"], validate=True)
+            sources.append(DocumentSource(str(i), f["name"], lambda c=content: c))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(process_document, s, **kwargs) for s in sources]
+            for source, future in zip(sources, futures):
+                try:
+                    record = future.result()
+                except Exception as e:
+                    record = {"key": source.key, "file_name": source.name, "status": "error", "error": str(e)}
+                self.wfile.write((json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+    def _handle_job(self, body):
+        """Starts a resumable directory batch in a background thread."""
+        kwargs = _process_kwargs(self.state, body)
+        workers = _workers(self.state, body)
+        input_dir = _resolve_under_root(self.state.root, body["input_dir"])
+        if not os.path.isdir(input_dir):
+            raise ValueError(f"Not a directory: {body['input_dir']}")
+        job_id = uuid.uuid4().hex
+        output = _resolve_under_root(self.state.root, body.get("output") or os.path.join("jobs", f"{job_id}.jsonl"))
+        checkpoint = _resolve_under_root(self.state.root, body.get("checkpoint") or output + ".ckpt")
+        job = {"job_id": job_id, "status": "running", "output": output, "checkpoint": checkpoint}
+        with self.state.jobs_lock:
+            self.state.jobs[job_id] = job
+
+        def run():
+            try:
+                paths = list(core.iter_documents(input_dir, recursive=body.get("recursive", True)))
+                run_batch(sources_from_paths(paths), output, checkpoint_path=checkpoint,
+                          workers=workers, stats=job, **kwargs)
+                job["status"] = "finished"
+            except Exception as e:
+                logger.exception("Job %s failed", job_id)
+                job["status"] = "error"
+                job["error"] = str(e)
+
+        threading.Thread(target=run, name=f"job-{job_id}", daemon=True).start()
+        self._send_json(202, {"job_id": job_id, "output": output, "checkpoint": checkpoint})
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def make_server(host, port, state):
+    handler = type("BoundAPIHandler", (APIHandler,), {"state": state})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Neural Scribe HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml", help="Path to secrets.toml.")
+    parser.add_argument("--rpm", type=int, default=0,
+                        help="Max OpenAI requests per minute across all requests (0 = unlimited).")
+    parser.add_argument("--max-workers", type=int, default=16, help="Upper bound on per-request workers.")
+    parser.add_argument("--data-root", default="data",
+                        help="Directory that /jobs input and output paths must stay within (default: data).")
+    parser.add_argument("--embedding-dir", default=embeddings.DEFAULT_STORE_DIR,
+                        help="Vector cache directory for mode embed; not shared with other processes.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    secrets = core.load_secrets(args.secrets)
+    state = APIState(
+        init_clients(secrets),
+        core.RateLimiter(args.rpm),
+        args.data_root,
+        token=secrets.get("api", {}).get("token"),
+        max_workers=args.max_workers,
+        embedding_dir=args.embedding_dir,
+    )
+    server = make_server(args.host, args.port, state)
+    logger.info("Listening on http://%s:%d", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,16 @@
 import streamlit as st
 from streamlit_google_auth import Authenticate
 import json # To load the credentials dict
+import jwt # PyJWT, also used by streamlit_google_auth to sign the cookie
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+COOKIE_NAME = 'neural_scribe_cookie_v2' # Use a unique cookie name
+COOKIE_KEY = 'a_reasonably_strong_secret_key_v2' # Use a strong, unique key from secrets if possible
+SESSION_CACHE_TTL_SECONDS = 15 * 60 # Max time a verified cookie is trusted without re-checking
+SESSION_CACHE_MAX_ENTRIES = 10000
 
 # -----------------------------------------------------------------------------
 # Configuration & Initialization
@@ -26,8 +36,8 @@ try:
         authenticator = Authenticate(
             # Pass the dictionary directly
             secret_credentials=credentials_dict,
-            cookie_name='neural_scribe_cookie_v2', # Use a unique cookie name
-            cookie_key='a_reasonably_strong_secret_key_v2', # Use a strong, unique key from secrets if possible
+            cookie_name=COOKIE_NAME,
+            cookie_key=COOKIE_KEY,
             redirect_uri='http://localhost:8501', # Ensure this matches your redirect URI in Google Cloud Console
         )
         google_auth_initialized = True
@@ -42,6 +52,101 @@ except Exception as e:
     google_auth_initialized = False
     authenticator = None
 
+# -----------------------------------------------------------------------------
+# Verified Session Cache
+# -----------------------------------------------------------------------------
+# auth.py is imported once per process, so this cache is shared by all sessions.
+# It maps a hash of the auth cookie to the identity the library verified for it,
+# letting repeat checks skip authenticator.check_authentification() entirely.
+# Only cookies that pass the library's own checks are cached. Entries expire
+# after SESSION_CACHE_TTL_SECONDS or at the cookie's own expiry, whichever
+# comes first; the oldest entries are evicted beyond the cap.
+
+_verified_sessions = OrderedDict() # cookie hash -> (identity dict, expires_at)
+_verified_sessions_lock = threading.Lock()
+
+
+def _get_auth_cookie():
+    """Returns the raw auth cookie for the current request, if readable."""
+    try:
+        return st.context.cookies.get(COOKIE_NAME)
+    except Exception:
+        return None # Older Streamlit versions have no st.context.cookies
+
+
+def _cookie_key(cookie):
+    return hashlib.sha256(cookie.encode("utf-8")).hexdigest()
+
+
+def _cookie_claims(cookie):
+    """Returns the claims of a valid auth cookie, or None.
+
+    Applies the same checks as streamlit_google_auth's CookieHandler: an HS256
+    signature with COOKIE_KEY, an "email" claim and an unexpired "exp_date".
+    """
+    try:
+        claims = jwt.decode(cookie, COOKIE_KEY, algorithms=["HS256"])
+    except jwt.PyJWTError:
+        return None
+    expiry = _cookie_expiry(claims)
+    if "email" not in claims or expiry is None or expiry <= time.time():
+        return None
+    return claims
+
+
+def _cookie_expiry(claims):
+    """Returns the cookie's expiry timestamp: the library's "exp_date", else the standard "exp"."""
+    exp = claims.get("exp_date", claims.get("exp"))
+    try:
+        return float(exp) if exp is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def get_cached_identity(cookie):
+    """Returns the cached identity for a cookie, or None if missing or expired."""
+    key = _cookie_key(cookie)
+    now = time.time()
+    with _verified_sessions_lock:
+        entry = _verified_sessions.get(key)
+        if entry is None:
+            return None
+        identity, expires_at = entry
+        if expires_at <= now:
+            del _verified_sessions[key]
+            return None
+        _verified_sessions.move_to_end(key)
+        return dict(identity) # Copy: sessions must not share the cached object
+
+
+def cache_identity(cookie, identity):
+    """Caches the identity for a cookie that is valid and issued for that identity.
+
+    Returns True if it was cached. Expired and oldest entries are evicted.
+    """
+    claims = _cookie_claims(cookie)
+    if claims is None or claims.get("email") != identity.get("email"):
+        return False # e.g. a stale cookie while the session signed in via ?code=
+    now = time.time()
+    expires_at = min(now + SESSION_CACHE_TTL_SECONDS, _cookie_expiry(claims))
+
+    key = _cookie_key(cookie)
+    with _verified_sessions_lock:
+        _verified_sessions[key] = (dict(identity), expires_at)
+        _verified_sessions.move_to_end(key)
+        expired = [k for k, (_, exp) in _verified_sessions.items() if exp <= now]
+        for k in expired:
+            del _verified_sessions[k]
+        while len(_verified_sessions) > SESSION_CACHE_MAX_ENTRIES:
+            _verified_sessions.popitem(last=False)
+    return True
+
+
+def evict_cached_identity(cookie):
+    """Drops a cookie from the cache (used on logout)."""
+    with _verified_sessions_lock:
+        _verified_sessions.pop(_cookie_key(cookie), None)
+
 # -----------------------------------------------------------------------------
 # Authentication Functions
 # -----------------------------------------------------------------------------
@@ -52,12 +157,25 @@ def google_login_flow():
         st.error("Google Authentication is not configured correctly.")
         return
 
-    # Check authentication status using the library's method
-    # This method handles the token verification based on cookies
-    authenticator.check_authentification() # Removed timeout, let library handle it
+    cookie = _get_auth_cookie()
+    identity = get_cached_identity(cookie) if cookie else None
+    if identity is not None:
+        # Cookie already verified by this process: restore the identity from memory
+        st.session_state['connected'] = True
+        st.session_state['user_info'] = identity
+        st.session_state['oauth_id'] = identity.get('id')
+    else:
+        was_connected = st.session_state.get('connected', False)
+        # Check authentication status using the library's method
+        # This method handles the token verification based on cookies
+        authenticator.check_authentification() # Removed timeout, let library handle it
 
-    # If check_authentification finds a valid token, it sets st.session_state['connected'] = True
-    # and populates st.session_state['user_info']
+        # If check_authentification finds a valid token, it sets st.session_state['connected'] = True
+        # and populates st.session_state['user_info']. Cache only a sign-in made
+        # by this call; cache_identity re-checks that the cookie sent is the one
+        # that signed the user in (not a rejected cookie next to a ?code= login).
+        if cookie and not was_connected and st.session_state.get('connected', False) and st.session_state.get('user_info'):
+            cache_identity(cookie, st.session_state['user_info'])
 
     if not st.session_state.get('connected', False):
         # If not connected, show the login button which redirects to Google
@@ -143,8 +261,13 @@ def logout():
         except Exception as e:
             st.warning(f"Issue during library logout: {e}") # Non-critical usually
 
+    # Forget the verified cookie so it cannot restore the session from cache
+    cookie = _get_auth_cookie()
+    if cookie:
+        evict_cached_identity(cookie)
+
     # Clear relevant session state keys
-    keys_to_clear = ['connected', 'user_info', 'user', 'chat_history', 'document_text', 'current_file_name', 'summary']
+    keys_to_clear = ['connected', 'user_info', 'user', 'chat_history', 'chat_earlier', 'chat_offloaded', 'chat_window_turns', 'document_text', 'current_file_name', 'summary']
     for key in keys_to_clear:
         if key in st.session_state:
             del st.session_state[key]
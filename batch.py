@@ -0,0 +1,239 @@
+# batch.py
+# Headless batch processing over directories of documents.
+#
+# Usage:
+#   python batch.py INPUT_DIR -o results.jsonl --mode summarize --workers 8 --rpm 500
+#
+# Each processed document produces one JSON line in the output file. Completed
+# documents are appended to a checkpoint file so an interrupted run can simply be
+# restarted with the same arguments and will skip what is already done.
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import core
+import embeddings
+
+logger = logging.getLogger(__name__)
+
+MODES = ("extract", "summarize", "embed")
+
+# A unit of work: `key` identifies it in the checkpoint, `read` returns its bytes.
+DocumentSource = namedtuple("DocumentSource", ["key", "name", "read"])
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def sources_from_paths(paths):
+    """Wraps file paths as DocumentSources keyed by absolute path."""
+    return [
+        DocumentSource(os.path.abspath(p), os.path.basename(p), lambda p=p: _read_file(p))
+        for p in paths
+    ]
+
+
+def init_clients(secrets):
+    """Initializes Firestore, Vision and OpenAI from a secrets mapping.
+
+    Mirrors the Streamlit app's secrets.toml layout. Missing sections leave the
+    corresponding client as None.
+    """
+    clients = {"db": None, "vision_client": None}
+    if "firebase_service_account" in secrets:
+        clients["db"] = core.init_firebase(secrets["firebase_service_account"])
+    if "google_cloud_vision_service_account" in secrets:
+        clients["vision_client"] = core.init_vision(secrets["google_cloud_vision_service_account"])
+    if "openai" in secrets and "api_key" in secrets["openai"]:
+        core.init_openai(secrets["openai"]["api_key"])
+    return clients
+
+
+def load_checkpoint(checkpoint_path):
+    """Returns the set of source keys already completed."""
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def process_document(source, mode="summarize", language="en", vision_client=None,
+                     rate_limiter=None, model=core.DEFAULT_MODEL, db=None, user_email=None,
+                     embedding_service=None):
+    """Processes one document and returns a JSON-serialisable result record."""
+    started = time.monotonic()
+    record = {"key": source.key, "file_name": source.name, "mode": mode, "status": "ok"}
+    warnings = []
+    try:
+        text = core.extract_text(source.name, source.read(), vision_client, warnings=warnings)
+        if not text:
+            raise core.ExtractionError("No text extracted from document.")
+        record["chars"] = len(text)
+
+        if mode == "extract":
+            record["text"] = text
+        elif mode == "summarize":
+            summary = core.call_openai_api(
+                core.build_summary_prompt(text, language), model=model, rate_limiter=rate_limiter
+            )
+            record["language"] = language
+            record["summary"] = summary
+            if db is not None:
+                core.save_to_firestore(db, "summaries", {
+                    "file_name": source.name,
+                    "summary": summary,
+                    "language": language
+                }, user_email=user_email)
+        elif mode == "embed":
+            # Vectors live in the embedding store; records reference them by chunk hash
+            service = embedding_service or embeddings.get_embedding_service()
+            chunks = embeddings.chunk_text(text)
+            service.embed(chunks)
+            record["chunks"] = len(chunks)
+            record["chunk_hashes"] = [embeddings.chunk_hash(c, service.instruction).hex() for c in chunks]
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e)
+
+    if warnings:
+        record["warnings"] = warnings
+    record["elapsed_s"] = round(time.monotonic() - started, 3)
+    return record
+
+
+def run_batch(sources, output_path, checkpoint_path=None, workers=4, stats=None,
+              on_record=None, **process_kwargs):
+    """Processes sources in parallel, appending JSONL records to output_path.
+
+    Sources whose key is in the checkpoint are skipped; successful records are
+    added to the checkpoint after their output line is flushed. At most
+    2 x workers documents are in flight at a time, so records are released
+    once written. `stats`, if given, is a dict updated in place so callers
+    (e.g. the HTTP API) can poll progress. Returns the stats dict.
+    """
+    if stats is None:
+        stats = {}
+    done = load_checkpoint(checkpoint_path)
+    pending = [s for s in sources if s.key not in done]
+    stats.update({
+        "total": len(sources), "skipped": len(sources) - len(pending),
+        "ok": 0, "failed": 0, "elapsed_s": 0.0, "docs_per_sec": 0.0,
+    })
+
+    lock = threading.Lock()
+    started = time.monotonic()
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+
+    workers = max(1, workers)
+    max_in_flight = workers * 2  # Keeps workers busy without holding every result
+    remaining = iter(pending)
+    in_flight = set()
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+         open(checkpoint_path or os.devnull, "a", encoding="utf-8") as ckpt, \
+         ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            for source in remaining:
+                in_flight.add(pool.submit(process_document, source, **process_kwargs))
+                if len(in_flight) >= max_in_flight:
+                    break
+            if not in_flight:
+                break
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                record = future.result()
+                with lock:
+                    out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                    out.flush()
+                    if record["status"] == "ok":
+                        ckpt.write(record["key"] + "\n")
+                        ckpt.flush()
+                        stats["ok"] += 1
+                    else:
+                        stats["failed"] += 1
+                    elapsed = time.monotonic() - started
+                    stats["elapsed_s"] = round(elapsed, 3)
+                    processed = stats["ok"] + stats["failed"]
+                    stats["docs_per_sec"] = round(processed / elapsed, 3) if elapsed else 0.0
+                if on_record is not None:
+                    on_record(record)
+            del finished  # Drop finished futures (and their records) before waiting again
+
+    return stats
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Batch-process documents with Neural Scribe.")
+    parser.add_argument("input_dir", help="Directory containing PDF/TXT/JPG/PNG files.")
+    parser.add_argument("-o", "--output", required=True, help="JSONL output file (appended to).")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: OUTPUT.ckpt).")
+    parser.add_argument("--mode", choices=MODES, default="summarize")
+    parser.add_argument("--language", default="en", help="Summary language (default: en).")
+    parser.add_argument("--model", default=core.DEFAULT_MODEL)
+    parser.add_argument("--workers", type=int, default=4, help="Parallel workers (default: 4).")
+    parser.add_argument("--rpm", type=int, default=0,
+                        help="Max OpenAI requests per minute across all workers (0 = unlimited).")
+    parser.add_argument("--no-recursive", action="store_true", help="Do not descend into subdirectories.")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml", help="Path to secrets.toml.")
+    parser.add_argument("--save-to-firestore", action="store_true",
+                        help="Also save summaries to Firestore like the app does.")
+    parser.add_argument("--user-email", help="User email recorded with Firestore entries.")
+    parser.add_argument("--embedding-dir", default=embeddings.DEFAULT_STORE_DIR,
+                        help="Vector cache directory for --mode embed.")
+    parser.add_argument("--embedding-workers", type=int, default=1,
+                        help="Embedding worker threads for --mode embed (default: 1).")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    clients = init_clients(core.load_secrets(args.secrets))
+    paths = list(core.iter_documents(args.input_dir, recursive=not args.no_recursive))
+
+    embedding_service = None
+    if args.mode == "embed":
+        embedding_service = embeddings.get_embedding_service(
+            store_dir=args.embedding_dir, workers=args.embedding_workers
+        )
+        embedding_service.warm_up()
+
+    def log_record(record):
+        if record["status"] == "ok":
+            logger.info("✅ %s (%.2fs)", record["key"], record["elapsed_s"])
+        else:
+            logger.error("❌ %s: %s", record["key"], record["error"])
+
+    stats = run_batch(
+        sources_from_paths(paths),
+        args.output,
+        checkpoint_path=args.checkpoint or args.output + ".ckpt",
+        workers=args.workers,
+        on_record=log_record,
+        mode=args.mode,
+        language=args.language,
+        model=args.model,
+        vision_client=clients["vision_client"],
+        rate_limiter=core.RateLimiter(args.rpm),
+        db=clients["db"] if args.save_to_firestore else None,
+        user_email=args.user_email,
+        embedding_service=embedding_service,
+    )
+    logger.info("Done: %s", json.dumps(stats))
+    if embedding_service is not None:
+        logger.info("Embeddings: %s", json.dumps(embedding_service.stats()))
+        embedding_service.close()
+    return 0 if stats["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
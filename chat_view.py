@@ -0,0 +1,151 @@
+# chat_view.py
+# Windowed chat rendering for the dashboard.
+#
+# Only the most recent CHAT_WINDOW_TURNS turns are drawn, as a single markdown
+# element built from HTML cached on each message. Older turns are revealed on
+# demand with "Load earlier messages". The live history is capped at
+# MAX_CHAT_HISTORY_MESSAGES; trimmed turns are already saved in Firestore's
+# chat_history collection and are paged back from there into a separate buffer
+# of up to MAX_CHAT_EARLIER_MESSAGES.
+import html
+
+import streamlit as st
+
+CHAT_WINDOW_TURNS = 20          # Turns drawn initially
+CHAT_LOAD_MORE_TURNS = 20       # Turns added per "Load earlier messages" click
+MAX_CHAT_HISTORY_MESSAGES = 200 # Messages kept in chat_history
+MAX_CHAT_EARLIER_MESSAGES = 200 # Messages re-loaded from Firestore into chat_earlier
+
+_EMPTY_CHAT_HTML = '<div style="text-align: center; color: grey; padding: 20px;">Chat history is empty. Ask a question below!</div>'
+
+# -----------------------------------------------------------------------------
+# State
+# -----------------------------------------------------------------------------
+
+def init_chat_state():
+    """Initializes chat session state keys if they don't exist."""
+    if "chat_history" not in st.session_state:
+        st.session_state.chat_history = []
+    if "chat_earlier" not in st.session_state:
+        st.session_state.chat_earlier = []  # Older messages re-loaded from Firestore
+    if "chat_offloaded" not in st.session_state:
+        st.session_state.chat_offloaded = 0  # Firestore messages older than the oldest one in memory
+    if "chat_window_turns" not in st.session_state:
+        st.session_state.chat_window_turns = CHAT_WINDOW_TURNS
+
+
+def reset_chat_state():
+    """Clears the chat for a new document or on "Clear Current Chat"."""
+    st.session_state.chat_history = []
+    st.session_state.chat_earlier = []
+    st.session_state.chat_offloaded = 0
+    st.session_state.chat_window_turns = CHAT_WINDOW_TURNS
+
+
+def append_message(role, content, timestamp=None):
+    """Appends a message to the history, caching its rendered HTML."""
+    message = {"role": role, "content": content}
+    if timestamp is not None:
+        message["timestamp"] = timestamp
+    bubble_html(message)
+    st.session_state.chat_history.append(message)
+    return message
+
+
+def remove_message(message):
+    """Removes a message from the history, e.g. a question that got no answer."""
+    history = st.session_state.chat_history
+    if history and history[-1] is message:
+        history.pop()
+
+
+def cap_history():
+    """Trims the oldest messages of chat_history beyond MAX_CHAT_HISTORY_MESSAGES.
+
+    Trimmed turns stay in Firestore. Re-loaded pages sit right before the
+    trimmed turns, so they are dropped too and can be paged back in.
+    """
+    history = st.session_state.chat_history
+    overflow = len(history) - MAX_CHAT_HISTORY_MESSAGES
+    if overflow <= 0:
+        return
+    overflow += overflow % 2  # Keep user/assistant pairs together
+    del history[:overflow]
+    st.session_state.chat_offloaded += overflow + len(st.session_state.chat_earlier)
+    st.session_state.chat_earlier = []
+
+# -----------------------------------------------------------------------------
+# Rendering
+# -----------------------------------------------------------------------------
+
+def bubble_html(message):
+    """Returns the escaped chat bubble HTML for a message, cached on the message."""
+    if "html" not in message:
+        bubble_class = "user" if message["role"] == "user" else "assistant"
+        message["html"] = f'<div class="chat-bubble {bubble_class}">{html.escape(message["content"])}</div>'
+    return message["html"]
+
+
+def _oldest_timestamp(messages):
+    for message in messages:
+        if message.get("timestamp") is not None:
+            return message["timestamp"]
+    return None
+
+
+def render_chat(load_earlier):
+    """Draws the chat window.
+
+    Returns the container new bubbles are appended to and the placeholder
+    holding the empty-chat note (None if there are messages).
+    `load_earlier(before, turns)` must return up to `turns` older turns as
+    chronological messages ending before timestamp `before` (None = newest).
+    """
+    history = st.session_state.chat_history
+    earlier = st.session_state.chat_earlier
+    window = st.session_state.chat_window_turns * 2
+    loaded = len(earlier) + len(history)
+    offloaded = st.session_state.chat_offloaded
+    room_turns = (MAX_CHAT_EARLIER_MESSAGES - len(earlier)) // 2
+    can_fetch = offloaded > 0 and room_turns > 0
+
+    if loaded > window or can_fetch:
+        if st.button("⬆️ Load earlier messages", key="chat_load_earlier"):
+            st.session_state.chat_window_turns += CHAT_LOAD_MORE_TURNS
+            window = st.session_state.chat_window_turns * 2
+            missing_turns = (window - loaded + 1) // 2
+            if missing_turns > 0 and can_fetch:
+                requested_turns = min(missing_turns, (offloaded + 1) // 2, room_turns)
+                before = _oldest_timestamp(earlier + history)
+                older = load_earlier(before, requested_turns) if before is not None else []
+                for message in older:
+                    bubble_html(message)
+                st.session_state.chat_earlier = earlier = older + earlier
+                if len(older) < requested_turns * 2:
+                    # Firestore has nothing older (e.g. some turns were never saved)
+                    st.session_state.chat_offloaded = 0
+                else:
+                    st.session_state.chat_offloaded = max(0, offloaded - len(older))
+    elif offloaded > 0:
+        st.caption("Older messages are available under 📜 View History.")
+
+    messages = earlier + history if earlier else history
+    visible = messages[-window:]
+
+    chat_box = st.container(height=450)
+    empty_note = None
+    with chat_box:
+        if visible:
+            st.markdown("".join(bubble_html(m) for m in visible), unsafe_allow_html=True)
+        else:
+            empty_note = st.empty()
+            empty_note.markdown(_EMPTY_CHAT_HTML, unsafe_allow_html=True)
+    return chat_box, empty_note
+
+
+def append_bubbles(chat_box, messages, empty_note=None):
+    """Draws new bubbles at the end of the chat without redrawing the window."""
+    if empty_note is not None:
+        empty_note.empty()
+    with chat_box:
+        st.markdown("".join(bubble_html(m) for m in messages), unsafe_allow_html=True)
@@ -0,0 +1,252 @@
+# core.py
+# UI-independent document processing core shared by the Streamlit app (app.py),
+# the batch CLI (batch.py) and the HTTP API (api.py).
+# Nothing in here may import streamlit: errors are raised, warnings are logged.
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+import fitz  # PyMuPDF
+import openai
+import firebase_admin
+from firebase_admin import credentials, firestore
+import google.cloud.vision_v1 as vision
+from google.oauth2 import service_account
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".jpg", ".jpeg", ".png")
+DEFAULT_MODEL = "gpt-4o-mini"
+SYSTEM_PROMPT = "You are a helpful assistant processing documents."
+OPENAI_MAX_RETRIES = 4          # Retries on rate limits and timeouts before giving up
+OPENAI_RETRY_BASE_DELAY_S = 1.0 # Doubled after every retry, plus jitter
+
+
+class ExtractionError(Exception):
+    """Raised when no text can be extracted from a document."""
+
+
+class LLMError(Exception):
+    """Raised when the OpenAI API call fails."""
+
+
+# -----------------------------------------------------------------------------
+# Client Initialization
+# -----------------------------------------------------------------------------
+
+def _fix_private_key(creds_dict):
+    """Returns a copy of a service account dict with escaped newlines restored."""
+    creds_dict = dict(creds_dict)
+    if "private_key" in creds_dict:
+        creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
+    return creds_dict
+
+
+def load_secrets(path=".streamlit/secrets.toml"):
+    """Loads a Streamlit-style secrets.toml file for headless use."""
+    try:
+        import tomllib
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    except ImportError:  # Python < 3.11
+        import toml
+        with open(path, "r", encoding="utf-8") as f:
+            return toml.load(f)
+
+
+def init_firebase(service_account_info):
+    """Initializes Firebase once per process and returns a Firestore client."""
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(_fix_private_key(service_account_info))
+        firebase_admin.initialize_app(cred)
+    return firestore.client()
+
+
+def init_vision(service_account_info):
+    """Creates a Google Cloud Vision client from service account info."""
+    vision_credentials = service_account.Credentials.from_service_account_info(
+        _fix_private_key(service_account_info)
+    )
+    return vision.ImageAnnotatorClient(credentials=vision_credentials)
+
+
+def init_openai(api_key):
+    """Configures the OpenAI module-level API key."""
+    openai.api_key = api_key
+
+
+# -----------------------------------------------------------------------------
+# Rate Limiting
+# -----------------------------------------------------------------------------
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls to at most `per_minute` per minute.
+
+    Shared by all workers of a batch so throughput is bounded by the API quota
+    rather than by the number of threads. A limit of 0 or None disables it.
+    """
+
+    def __init__(self, per_minute=None):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# -----------------------------------------------------------------------------
+# Text Extraction
+# -----------------------------------------------------------------------------
+
+def _ocr_image_bytes(vision_client, image_bytes):
+    """Runs Vision OCR on raw image bytes and returns the detected text."""
+    image = vision.Image(content=image_bytes)
+    response = vision_client.text_detection(image=image)
+    if response.error.message:
+        raise ExtractionError(f"Vision API Error: {response.error.message}")
+    return response.full_text_annotation.text
+
+
+def extract_text(file_name, file_bytes, vision_client=None, warnings=None):
+    """Extracts text from document bytes (PDF, TXT, JPG, PNG).
+
+    Non-fatal problems (e.g. one unreadable image in a PDF) are appended to
+    `warnings` if a list is given and logged. Raises ExtractionError when the
+    document cannot be processed at all.
+    """
+    def warn(message):
+        logger.warning("%s: %s", file_name, message)
+        if warnings is not None:
+            warnings.append(message)
+
+    name = file_name.lower()
+    text = ""
+    try:
+        if name.endswith(".txt"):
+            text = file_bytes.decode("utf-8")
+        elif name.endswith(".pdf"):
+            pdf_document = fitz.open(stream=file_bytes, filetype="pdf")
+            try:
+                if not vision_client:
+                    warn("Google Cloud Vision client not initialized. Skipping image OCR in PDF.")
+                for page_num in range(len(pdf_document)):
+                    page = pdf_document[page_num]
+                    text += page.get_text("text") + "\n"
+
+                    if not vision_client:
+                        continue
+                    for img_index, img in enumerate(page.get_images(full=True)):
+                        xref = img[0]
+                        try:
+                            base_image = pdf_document.extract_image(xref)
+                            text += _ocr_image_bytes(vision_client, base_image["image"]) + "\n"
+                        except Exception as img_e:
+                            warn(f"Could not process image {img_index+1} on page {page_num+1}: {img_e}")
+            finally:
+                pdf_document.close()
+        elif name.endswith((".jpg", ".jpeg", ".png")):
+            if not vision_client:
+                raise ExtractionError("Google Cloud Vision client not initialized. Cannot process image files.")
+            text = _ocr_image_bytes(vision_client, file_bytes)
+        else:
+            raise ExtractionError(f"Unsupported file type: {file_name}")
+    except ExtractionError:
+        raise
+    except Exception as e:
+        raise ExtractionError(f"Error extracting text from {file_name}: {e}") from e
+
+    return text
+
+
+# -----------------------------------------------------------------------------
+# LLM Calls
+# -----------------------------------------------------------------------------
+
+def build_summary_prompt(document_text, language):
+    """Builds the summarization prompt used by the app and batch jobs."""
+    return f"Summarize the following document in {language}:\n\n---\n\n{document_text}\n\n---\n\nSummary:"
+
+
+def build_chat_prompt(document_text, question):
+    """Builds the document Q&A prompt."""
+    return f"""Context: You are chatting with a user about the following document:
+                        --- Document Start ---
+                        {document_text}
+                        --- Document End ---
+
+                        User's Question: {question}
+
+                        Provide a helpful and concise answer based *only* on the document content provided. If the answer isn't in the document, say so.
+                        """
+
+
+def call_openai_api(prompt, model=DEFAULT_MODEL, temperature=0.7, rate_limiter=None):
+    """Calls the OpenAI ChatCompletion API and returns the reply text.
+
+    Rate limit and timeout errors are retried with exponential backoff.
+    Raises LLMError on failure.
+    """
+    for attempt in range(OPENAI_MAX_RETRIES + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            response = openai.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=temperature,
+            )
+            return response.choices[0].message.content
+        except (openai.RateLimitError, openai.APITimeoutError) as e:
+            if attempt == OPENAI_MAX_RETRIES:
+                raise LLMError(f"OpenAI API Error after {attempt + 1} attempts: {e}") from e
+            delay = OPENAI_RETRY_BASE_DELAY_S * 2 ** attempt * (1 + random.random())
+            logger.warning("OpenAI %s, retrying in %.1fs", type(e).__name__, delay)
+            time.sleep(delay)
+        except openai.APIError as e:
+            raise LLMError(f"OpenAI API Error: {e}") from e
+        except Exception as e:
+            raise LLMError(f"An unexpected error occurred calling OpenAI: {e}") from e
+
+
+# -----------------------------------------------------------------------------
+# Persistence
+# -----------------------------------------------------------------------------
+
+def save_to_firestore(db, collection_name, data, user_email=None):
+    """Saves data to a Firestore collection, stamping user and timestamp.
+
+    Returns the timestamp written. Exceptions from Firestore propagate.
+    """
+    data["user_email"] = user_email or "unknown_user"
+    data["timestamp"] = datetime.now()
+    db.collection(collection_name).add(data)
+    return data["timestamp"]
+
+
+def iter_documents(input_dir, recursive=True):
+    """Yields paths of supported documents under a directory in sorted order."""
+    if recursive:
+        for root, dirs, files in os.walk(input_dir):
+            dirs.sort()
+            for file_name in sorted(files):
+                if file_name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    yield os.path.join(root, file_name)
+    else:
+        for file_name in sorted(os.listdir(input_dir)):
+            path = os.path.join(input_dir, file_name)
+            if os.path.isfile(path) and file_name.lower().endswith(SUPPORTED_EXTENSIONS):
+                yield path
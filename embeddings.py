@@ -0,0 +1,380 @@
+# embeddings.py
+# Batched CPU embedding service with a persistent per-chunk vector cache.
+#
+# Texts are hashed (SHA-256 of instruction + chunk) and looked up in a
+# memory-mapped NumPy store before anything is embedded, so identical chunks
+# across documents and users are embedded once per model. Misses from all
+# concurrent callers are queued and encoded in shared batches on a dedicated
+# worker pool that uses one warm INSTRUCTOR model per process. Like core.py,
+# this module does not import streamlit.
+#
+# The store is safe for many threads in one process. Only one process may open
+# a store directory at a time; it is held with an exclusive lock file.
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = "hkunlp/instructor-base"
+DEFAULT_INSTRUCTION = "Represent the document for retrieval:"
+DEFAULT_STORE_DIR = os.environ.get("NEURAL_SCRIBE_EMBEDDING_DIR", "embeddings_cache")
+KEY_BYTES = 32  # SHA-256 digest size
+
+
+class StoreLockedError(RuntimeError):
+    """Raised when another process already has the vector store directory open."""
+
+# -----------------------------------------------------------------------------
+# Chunking & Hashing
+# -----------------------------------------------------------------------------
+
+def chunk_text(text, chunk_size=1000, overlap=100):
+    """Splits text into overlapping character chunks, skipping blank ones."""
+    if chunk_size <= overlap:
+        raise ValueError("chunk_size must be larger than overlap")
+    chunks = []
+    step = chunk_size - overlap
+    for start in range(0, len(text), step):
+        chunk = text[start:start + chunk_size].strip()
+        if chunk:
+            chunks.append(chunk)
+        if start + chunk_size >= len(text):
+            break
+    return chunks
+
+
+def chunk_hash(text, instruction=DEFAULT_INSTRUCTION):
+    """Returns the 32-byte cache key for a chunk embedded with an instruction."""
+    return hashlib.sha256(f"{instruction}\0{text}".encode("utf-8")).digest()
+
+# -----------------------------------------------------------------------------
+# Vector Store
+# -----------------------------------------------------------------------------
+
+class VectorStore:
+    """Append-only memory-mapped vector store keyed by 32-byte digests.
+
+    Layout in `directory`: vectors.npy (float32, capacity x dim), keys.npy
+    (uint8, capacity x 32) and meta.json with the number of rows in use. Files
+    are created lazily on the first write, once the dimension is known, and
+    doubled in capacity when full. A `.lock` file is held exclusively until
+    close(), so a second process opening the same directory gets
+    StoreLockedError instead of overwriting rows.
+    """
+
+    def __init__(self, directory, initial_capacity=1024):
+        self.directory = directory
+        self.initial_capacity = initial_capacity
+        self._lock = threading.Lock()
+        self._index = {}
+        self._count = 0
+        self._vectors = None
+        self._keys = None
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = self._acquire_dir_lock()
+        if os.path.exists(self._path("meta.json")):
+            self._open()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _acquire_dir_lock(self):
+        fd = os.open(self._path(".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            raise StoreLockedError(
+                f"Embedding store {self.directory} is already open in another process; "
+                "give each process its own directory (--embedding-dir or NEURAL_SCRIBE_EMBEDDING_DIR)."
+            ) from None
+        return fd
+
+    def close(self):
+        """Releases the directory lock; the store cannot be used afterwards."""
+        with self._lock:
+            self._vectors = self._keys = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)  # Closing the descriptor releases the lock
+                self._lock_fd = None
+
+    def _open(self):
+        with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+            self._count = json.load(f)["count"]
+        self._vectors = np.load(self._path("vectors.npy"), mmap_mode="r+")
+        self._keys = np.load(self._path("keys.npy"), mmap_mode="r+")
+        self._index = {self._keys[i].tobytes(): i for i in range(self._count)}
+
+    def _write_meta(self):
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"count": self._count, "dim": int(self._vectors.shape[1])}, f)
+        os.replace(tmp_path, self._path("meta.json"))
+
+    def _allocate(self, capacity, dim):
+        """Creates (or grows into) files of the given capacity, keeping existing rows."""
+        vectors = np.lib.format.open_memmap(self._path("vectors.npy.tmp"), mode="w+",
+                                            dtype=np.float32, shape=(capacity, dim))
+        keys = np.lib.format.open_memmap(self._path("keys.npy.tmp"), mode="w+",
+                                         dtype=np.uint8, shape=(capacity, KEY_BYTES))
+        if self._count:
+            vectors[:self._count] = self._vectors[:self._count]
+            keys[:self._count] = self._keys[:self._count]
+        vectors.flush()
+        keys.flush()
+        del vectors, keys
+        self._vectors = self._keys = None
+        os.replace(self._path("vectors.npy.tmp"), self._path("vectors.npy"))
+        os.replace(self._path("keys.npy.tmp"), self._path("keys.npy"))
+        self._vectors = np.load(self._path("vectors.npy"), mmap_mode="r+")
+        self._keys = np.load(self._path("keys.npy"), mmap_mode="r+")
+
+    def __len__(self):
+        return self._count
+
+    def get_many(self, keys):
+        """Returns {key: vector copy} for the keys present in the store."""
+        with self._lock:
+            return {k: np.array(self._vectors[self._index[k]]) for k in keys if k in self._index}
+
+    def add_many(self, keys, vectors):
+        """Appends vectors for keys not already stored."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            new_rows = [(k, v) for k, v in zip(keys, vectors) if k not in self._index]
+            if not new_rows:
+                return
+            needed = self._count + len(new_rows)
+            if self._vectors is None:
+                self._allocate(max(self.initial_capacity, needed), vectors.shape[1])
+            elif needed > self._vectors.shape[0]:
+                self._allocate(max(self._vectors.shape[0] * 2, needed), self._vectors.shape[1])
+
+            for key, vector in new_rows:
+                row = self._count
+                self._vectors[row] = vector
+                self._keys[row] = np.frombuffer(key, dtype=np.uint8)
+                self._index[key] = row
+                self._count += 1
+            self._vectors.flush()
+            self._keys.flush()
+            self._write_meta()
+
+# -----------------------------------------------------------------------------
+# Model Loading
+# -----------------------------------------------------------------------------
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_model(model_name=DEFAULT_MODEL_NAME):
+    """Loads an INSTRUCTOR model once per process and returns the shared instance."""
+    with _models_lock:
+        if model_name not in _models:
+            from InstructorEmbedding import INSTRUCTOR  # Heavy import (torch), keep lazy
+            started = time.monotonic()
+            _models[model_name] = INSTRUCTOR(model_name, device="cpu")
+            logger.info("Loaded %s in %.1fs", model_name, time.monotonic() - started)
+        return _models[model_name]
+
+# -----------------------------------------------------------------------------
+# Embedding Service
+# -----------------------------------------------------------------------------
+
+class EmbeddingService:
+    """Embeds texts on a dedicated pool, backed by a VectorStore cache.
+
+    Cache misses from all concurrent embed() calls go onto one queue. A
+    dispatcher thread waits for a free worker, then groups queued chunks into
+    a batch of up to batch_size (waiting at most max_wait_s for it to fill)
+    so the model sees full batches even when each caller sends only a few.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, instruction=DEFAULT_INSTRUCTION,
+                 store_dir=DEFAULT_STORE_DIR, batch_size=32, workers=1, max_wait_s=0.05):
+        self.model_name = model_name
+        self.instruction = instruction
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_s
+        # One store per model so vectors of different dimensions never mix
+        self.store = VectorStore(os.path.join(store_dir, re.sub(r"[^\w.-]", "_", model_name)))
+        # The model already uses every core for one batch; extra workers only help
+        # overlap batches when torch's intra-op parallelism is limited.
+        workers = max(1, workers)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed")
+        self._free_workers = threading.Semaphore(workers)
+        self._queue = queue.Queue()  # (key, text, Future) per missing chunk; None stops the dispatcher
+        self._inflight = {}          # key -> Future for chunks queued or being encoded
+        self._inflight_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._requested = 0
+        self._hits = 0
+        self._embedded = 0
+        self._batches = 0
+        self._running = 0          # Batches currently encoding
+        self._busy_since = 0.0
+        self._busy_seconds = 0.0   # Wall-clock time with at least one batch encoding
+
+        self._dispatcher = threading.Thread(target=self._dispatch, name="embed-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def warm_up(self):
+        """Loads the model on the worker pool ahead of the first request."""
+        self._pool.submit(get_model, self.model_name).result()
+
+    def _dispatch(self):
+        while True:
+            self._free_workers.acquire()
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait_s
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._pool.submit(self._encode_batch, batch)
+                    return
+                batch.append(item)
+            self._pool.submit(self._encode_batch, batch)
+
+    def _set_busy(self, delta):
+        with self._stats_lock:
+            now = time.monotonic()
+            if self._running == 0 and delta > 0:
+                self._busy_since = now
+            self._running += delta
+            if self._running == 0:
+                self._busy_seconds += now - self._busy_since
+
+    def _encode_batch(self, batch):
+        keys = [key for key, _, _ in batch]
+        self._set_busy(+1)
+        try:
+            model = get_model(self.model_name)
+            vectors = model.encode([[self.instruction, text] for _, text, _ in batch], batch_size=self.batch_size)
+            vectors = np.asarray(vectors, dtype=np.float32)
+            self.store.add_many(keys, vectors)
+            with self._stats_lock:
+                self._embedded += len(batch)
+                self._batches += 1
+            for (_, _, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            with self._inflight_lock:
+                for key in keys:
+                    self._inflight.pop(key, None)
+            self._set_busy(-1)
+            self._free_workers.release()
+
+    def embed(self, texts):
+        """Returns an array of shape (len(texts), dim), embedding only cache misses."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        keys = [chunk_hash(t, self.instruction) for t in texts]
+        found = self.store.get_many(set(keys))
+
+        # Each unique missing chunk is queued once, even if repeated in this call
+        # or already queued by another caller; only those queued here are misses.
+        pending = {}
+        queued = 0
+        with self._inflight_lock:
+            # A batch may have finished since the lookup above; check the store
+            # again for misses that are no longer in flight.
+            unresolved = {k for k in keys if k not in found and k not in self._inflight}
+            if unresolved:
+                found.update(self.store.get_many(unresolved))
+            for key, text in zip(keys, texts):
+                if key in found or key in pending:
+                    continue
+                future = self._inflight.get(key)
+                if future is None:
+                    future = Future()
+                    self._inflight[key] = future
+                    self._queue.put((key, text, future))
+                    queued += 1
+                pending[key] = future
+        with self._stats_lock:
+            self._requested += len(texts)
+            self._hits += len(texts) - queued
+
+        for key, future in pending.items():
+            found[key] = future.result()
+        return np.stack([found[k] for k in keys])
+
+    def stats(self):
+        """Returns throughput and cache statistics since the service started."""
+        with self._stats_lock:
+            busy = self._busy_seconds
+            if self._running:
+                busy += time.monotonic() - self._busy_since
+            return {
+                "requested": self._requested,
+                "cache_hits": self._hits,
+                "embedded": self._embedded,
+                "batches": self._batches,
+                "avg_batch_size": round(self._embedded / self._batches, 2) if self._batches else 0.0,
+                "hit_ratio": round(self._hits / self._requested, 4) if self._requested else 0.0,
+                "chunks_per_sec": round(self._embedded / busy, 2) if busy else 0.0,
+                "stored_vectors": len(self.store),
+            }
+
+    def close(self):
+        self._queue.put(None)
+        self._dispatcher.join()
+        self._pool.shutdown(wait=True)
+        self.store.close()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service(**kwargs):
+    """Returns the process-wide EmbeddingService, creating it on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = EmbeddingService(**kwargs)
+        return _service
+
+
+def get_stats():
+    """Returns the process-wide service's stats without creating it (zeros if unused)."""
+    service = _service
+    if service is None:
+        return {
+            "requested": 0, "cache_hits": 0, "embedded": 0, "batches": 0, "avg_batch_size": 0.0,
+            "hit_ratio": 0.0, "chunks_per_sec": 0.0, "stored_vectors": 0,
+        }
+    return service.stats()
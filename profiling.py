@@ -0,0 +1,209 @@
+# profiling.py
+# On-demand cProfile capture for admins (allowlisted in secrets.toml):
+#
+#   [admin]
+#   emails = ["you@example.com"]
+#
+# An admin arms a target in the sidebar: either the next N reruns or the next
+# N occurrences of an action (upload, summarize, chat, history). Profiles are
+# written to PROFILE_DIR as .prof files with a .json sidecar holding the action
+# name and timings. When nothing is armed, the hooks in app.py only do a
+# session_state lookup.
+import cProfile
+import json
+import os
+import pstats
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import streamlit as st
+
+PROFILE_DIR = os.environ.get("NEURAL_SCRIBE_PROFILE_DIR", "profiles")
+ACTIONS = ("rerun", "upload", "summarize", "chat", "history")
+
+_ARMED_KEY = "_profiling_armed"    # {"target": str, "remaining": int}
+_ERROR_KEY = "_profiling_error"    # Last capture that could not start, shown in the panel
+
+# -----------------------------------------------------------------------------
+# Admin Gate
+# -----------------------------------------------------------------------------
+
+def admin_emails():
+    """Returns the lower-cased admin allowlist from secrets."""
+    try:
+        emails = st.secrets.get("admin", {}).get("emails", [])
+    except Exception:
+        return set()
+    return {e.lower() for e in emails}
+
+
+def is_admin():
+    """True if the logged-in user's email is on the admin allowlist."""
+    email = (st.session_state.get("user") or {}).get("email")
+    return bool(email) and email.lower() in admin_emails()
+
+# -----------------------------------------------------------------------------
+# Capture
+# -----------------------------------------------------------------------------
+
+def _start(action):
+    """Starts a profiler, or returns None if another one is already active."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Python 3.12+ allows a single active profiler per process
+        st.session_state[_ERROR_KEY] = f"Could not profile {action}: {e}. The capture is still armed."
+        return None
+    return {
+        "action": action,
+        "profiler": profiler,
+        "started": time.perf_counter(),
+        "cpu_started": time.process_time(),  # Process-wide, includes other sessions' threads
+        "started_at": datetime.now(),
+        "user": (st.session_state.get("user") or {}).get("email"),
+    }
+
+
+def _finish(run, interrupted=False):
+    """Stops a profiler and writes the .prof file plus a .json sidecar."""
+    profiler = run["profiler"]
+    profiler.disable()
+    wall_s = time.perf_counter() - run["started"]
+    cpu_s = time.process_time() - run["cpu_started"]
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = f"{run['started_at']:%Y%m%d-%H%M%S}_{run['action']}_{uuid.uuid4().hex[:6]}"
+    prof_path = os.path.join(PROFILE_DIR, base + ".prof")
+    profiler.dump_stats(prof_path)
+    stats = pstats.Stats(prof_path)
+    meta = {
+        "action": run["action"],
+        "user": run["user"],
+        "started_at": run["started_at"].isoformat(timespec="seconds"),
+        "wall_s": round(wall_s, 4),
+        "cpu_s": round(cpu_s, 4),
+        "total_calls": stats.total_calls,
+        "interrupted": interrupted,
+        "profile": prof_path,
+    }
+    with open(os.path.join(PROFILE_DIR, base + ".json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def _is_armed(target):
+    armed = st.session_state.get(_ARMED_KEY)
+    return bool(armed) and armed["target"] == target
+
+
+def _start_armed(target):
+    """Starts a capture for target if armed, consuming it only once it started."""
+    if not _is_armed(target):
+        return None
+    run = _start(target)
+    if run is None:
+        return None
+    armed = st.session_state[_ARMED_KEY]
+    armed["remaining"] -= 1
+    if armed["remaining"] <= 0:
+        del st.session_state[_ARMED_KEY]
+    return run
+
+
+@contextmanager
+def profile_action(action):
+    """Profiles the enclosed block if the admin armed this action ("rerun" = page body)."""
+    run = _start_armed(action)
+    if run is None:
+        yield
+        return
+    try:
+        yield
+    except BaseException:
+        # st.rerun()/st.stop() raise RerunException/StopException (BaseExceptions);
+        # keep what was captured and let them, or any error, propagate.
+        _finish(run, interrupted=True)
+        raise
+    _finish(run)
+
+# -----------------------------------------------------------------------------
+# Inspection
+# -----------------------------------------------------------------------------
+
+def list_profiles(limit=20):
+    """Returns metadata of the most recent captured profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((n for n in os.listdir(PROFILE_DIR) if n.endswith(".json")), reverse=True)
+    profiles = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(PROFILE_DIR, name), "r", encoding="utf-8") as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def top_functions(prof_path, limit=25, sort_key="cumtime"):
+    """Returns the top functions of a profile as rows for st.dataframe."""
+    rows = []
+    for (file_name, line, func), (cc, nc, tt, ct, _callers) in pstats.Stats(prof_path).stats.items():
+        rows.append({
+            "function": func,
+            "location": f"{os.path.basename(file_name)}:{line}",
+            "ncalls": nc,
+            "tottime": round(tt, 5),
+            "cumtime": round(ct, 5),
+        })
+    rows.sort(key=lambda r: r[sort_key], reverse=True)
+    return rows[:limit]
+
+
+def render_admin_panel():
+    """Sidebar controls for arming captures and browsing stored profiles."""
+    if not is_admin():
+        return
+
+    with st.sidebar.expander("🛠️ Profiling (admin)"):
+        error = st.session_state.pop(_ERROR_KEY, None)
+        if error:
+            st.warning(error)
+        armed = st.session_state.get(_ARMED_KEY)
+        if armed:
+            st.info(f"Armed: next {armed['remaining']} × {armed['target']}")
+            if st.button("Disarm", key="profiling_disarm"):
+                del st.session_state[_ARMED_KEY]
+                st.rerun()
+        else:
+            target = st.selectbox("Profile", ACTIONS, key="profiling_target")
+            count = st.number_input("Next N", min_value=1, max_value=50, value=1, key="profiling_count")
+            if st.button("Arm profiler", key="profiling_arm"):
+                st.session_state[_ARMED_KEY] = {"target": target, "remaining": int(count)}
+                st.rerun()
+
+        profiles = list_profiles()
+        if not profiles:
+            st.caption("No profiles captured yet.")
+            return
+
+        labels = [
+            f"{p['started_at']} · {p['action']} · {p['wall_s']:.2f}s" + (" (interrupted)" if p.get("interrupted") else "")
+            for p in profiles
+        ]
+        index = st.selectbox("Captured profiles", range(len(labels)), format_func=labels.__getitem__,
+                             key="profiling_selected")
+        selected = profiles[index]
+        st.caption(f"User: {selected.get('user')} · process CPU {selected['cpu_s']:.2f}s · {selected['total_calls']} calls")
+        try:
+            st.dataframe(top_functions(selected["profile"]), use_container_width=True)
+            with open(selected["profile"], "rb") as f:
+                st.download_button("Download .prof", f.read(),
+                                   file_name=os.path.basename(selected["profile"]),
+                                   key="profiling_download")
+            st.caption("Open with `snakeviz` or `flameprof` for a flamegraph.")
+        except OSError as e:
+            st.error(f"❌ Could not read profile: {e}")
@@ -0,0 +1,73 @@
+import time
+
+import jwt
+import pytest
+
+import auth
+
+IDENTITY = {"email": "ada@example.com", "name": "Ada", "picture": None, "id": "42"}
+
+
+def make_cookie(key=auth.COOKIE_KEY, **claims):
+    # Same layout as streamlit_google_auth's CookieHandler._token_encode
+    payload = {"email": IDENTITY["email"], "name": "Ada", "picture": None, "oauth_id": "42",
+               "exp_date": time.time() + 3600}
+    payload.update(claims)
+    return jwt.encode(payload, key, algorithm="HS256")
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    auth._verified_sessions.clear()
+    yield
+    auth._verified_sessions.clear()
+
+
+def test_cached_until_exp_date_when_sooner_than_ttl():
+    exp_date = time.time() + 60
+    cookie = make_cookie(exp_date=exp_date)
+    assert auth.cache_identity(cookie, IDENTITY)
+    _, expires_at = auth._verified_sessions[auth._cookie_key(cookie)]
+    assert expires_at == pytest.approx(exp_date)
+    assert auth.get_cached_identity(cookie) == IDENTITY
+
+
+def test_cached_for_ttl_when_cookie_outlives_it():
+    cookie = make_cookie(exp_date=time.time() + 30 * 86400)
+    before = time.time()
+    assert auth.cache_identity(cookie, IDENTITY)
+    _, expires_at = auth._verified_sessions[auth._cookie_key(cookie)]
+    assert before + auth.SESSION_CACHE_TTL_SECONDS <= expires_at <= time.time() + auth.SESSION_CACHE_TTL_SECONDS
+
+
+def test_standard_exp_claim_is_used_without_exp_date():
+    exp = int(time.time()) + 120
+    cookie = jwt.encode({"email": IDENTITY["email"], "exp": exp}, auth.COOKIE_KEY, algorithm="HS256")
+    assert auth.cache_identity(cookie, IDENTITY)
+    _, expires_at = auth._verified_sessions[auth._cookie_key(cookie)]
+    assert expires_at == pytest.approx(exp)
+
+
+@pytest.mark.parametrize("cookie", [
+    make_cookie(key="another-secret-key-of-32-bytes!!!"),          # Rejected by the library: bad signature
+    make_cookie(exp_date=time.time() - 1),      # Rejected by the library: expired
+    make_cookie(email="mallory@example.com"),   # Valid, but for someone else (?code= sign-in)
+    "not-a-jwt",
+])
+def test_rejected_or_foreign_cookie_is_not_cached(cookie):
+    assert not auth.cache_identity(cookie, IDENTITY)
+    assert auth.get_cached_identity(cookie) is None
+
+
+def test_cached_identity_is_a_copy():
+    cookie = make_cookie()
+    auth.cache_identity(cookie, IDENTITY)
+    auth.get_cached_identity(cookie)["email"] = "changed@example.com"
+    assert auth.get_cached_identity(cookie)["email"] == IDENTITY["email"]
+
+
+def test_evict():
+    cookie = make_cookie()
+    auth.cache_identity(cookie, IDENTITY)
+    auth.evict_cached_identity(cookie)
+    assert auth.get_cached_identity(cookie) is None
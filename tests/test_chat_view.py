@@ -0,0 +1,87 @@
+from streamlit.testing.v1 import AppTest
+
+import chat_view
+
+# Mirrors app.py: each exchange is appended and the history capped, then the
+# window is drawn. session_state.saved stands in for the turns saved to
+# Firestore's chat_history collection (one timestamp per turn).
+SCRIPT = """
+import streamlit as st
+import chat_view
+
+chat_view.init_chat_state()
+
+for t in st.session_state.pop("new_turns", []):
+    st.session_state.saved.append(t)
+    chat_view.append_message("user", f"q{t}", timestamp=t)
+    chat_view.append_message("assistant", f"a{t}", timestamp=t)
+    chat_view.cap_history()
+
+def load_earlier(before, turns):
+    st.session_state.fetches.append((before, turns))
+    messages = []
+    for t in [t for t in st.session_state.saved if t < before][-turns:]:
+        messages += [{"role": "user", "content": f"q{t}", "timestamp": t},
+                     {"role": "assistant", "content": f"a{t}", "timestamp": t}]
+    return messages
+
+chat_view.render_chat(load_earlier)
+"""
+
+
+def chat(at, first, last):
+    at.session_state.new_turns = list(range(first, last + 1))
+    return at.run()
+
+
+def in_memory_turns(at):
+    messages = at.session_state.chat_earlier + at.session_state.chat_history
+    assert [m["role"] for m in messages] == ["user", "assistant"] * (len(messages) // 2)
+    return [m["timestamp"] for m in messages[::2]]
+
+
+def load_until_fetch(at):
+    fetches = len(at.session_state.fetches)
+    while len(at.session_state.fetches) == fetches:
+        at.button(key="chat_load_earlier").click().run()
+    return at.session_state.fetches[-1]
+
+
+def new_app():
+    at = AppTest.from_string(SCRIPT)
+    at.session_state.saved = []
+    at.session_state.fetches = []
+    return at
+
+
+def test_pages_back_after_history_was_capped():
+    at = chat(new_app(), 1, 150)
+    assert len(at.session_state.chat_history) == chat_view.MAX_CHAT_HISTORY_MESSAGES
+    assert at.session_state.chat_offloaded == 100
+
+    # Clicks first widen the window over memory, then fetch the turns before it
+    before, turns = load_until_fetch(at)
+    assert (before, turns) == (51, chat_view.CHAT_LOAD_MORE_TURNS)
+    assert in_memory_turns(at) == list(range(31, 151))
+    assert at.session_state.chat_offloaded == 60
+
+    while at.session_state.chat_offloaded:
+        load_until_fetch(at)
+    assert in_memory_turns(at) == list(range(1, 151))
+    assert len(at.session_state.chat_earlier) <= chat_view.MAX_CHAT_EARLIER_MESSAGES
+    assert not at.exception
+
+
+def test_paging_still_works_after_new_turns_push_past_the_cap():
+    at = chat(new_app(), 1, 150)
+    load_until_fetch(at)
+
+    # The next exchange trims turn 51; the re-loaded turns before it go too
+    chat(at, 151, 151)
+    assert at.session_state.chat_earlier == []
+    assert in_memory_turns(at) == list(range(52, 152))
+    assert at.session_state.chat_offloaded == 102
+
+    before, turns = load_until_fetch(at)
+    assert before == 52
+    assert in_memory_turns(at) == list(range(52 - turns, 152))
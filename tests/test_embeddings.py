@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import embeddings
+
+
+def test_store_round_trip(tmp_path):
+    store = embeddings.VectorStore(str(tmp_path), initial_capacity=2)
+    keys = [embeddings.chunk_hash(t) for t in ("a", "b", "c")]
+    store.add_many(keys, np.eye(3, dtype=np.float32))  # Grows past the initial capacity
+    store.close()
+
+    reopened = embeddings.VectorStore(str(tmp_path))
+    assert len(reopened) == 3
+    np.testing.assert_array_equal(reopened.get_many([keys[2]])[keys[2]], [0, 0, 1])
+    reopened.close()
+
+
+def test_store_directory_is_single_writer(tmp_path):
+    store = embeddings.VectorStore(str(tmp_path))
+    other_process = subprocess.run(
+        [sys.executable, "-c", "import sys, embeddings; embeddings.VectorStore(sys.argv[1])", str(tmp_path)],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(embeddings.__file__)),
+    )
+    assert other_process.returncode != 0
+    assert "StoreLockedError" in other_process.stderr
+
+    with pytest.raises(embeddings.StoreLockedError):
+        embeddings.VectorStore(str(tmp_path))  # A second store in the same process, too
+    store.close()
+
+    embeddings.VectorStore(str(tmp_path)).close()  # Free again once closed